@@ -6,6 +6,11 @@ import asyncio
 import os
 from utp_runtime import UTPRuntimeEngine
 
+try:
+    import uvloop
+except ImportError:  # uvloop is optional; fall back to the stock asyncio loop
+    uvloop = None
+
 async def main():
     # Initialize UTP Runtime Engine
     engine = await UTPRuntimeEngine.create(
@@ -39,7 +44,7 @@ async def main():
     
     # Example 4: Subscribe to events
     async def on_workflow_event(event):
-        print(f"Event: {event['type']}")
+        print(f"Event: {event.type}")
     
     engine.event_bus.subscribe("workflow.*", on_workflow_event)
     
@@ -47,5 +52,8 @@ async def main():
     await engine.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
 
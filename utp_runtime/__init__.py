@@ -5,8 +5,8 @@ UTP Runtime Engine - Production-grade UTCP implementation
 from .engine import UTPRuntimeEngine
 from .discovery import AutoDiscoveryLayer
 from .orchestrator import WorkflowOrchestrator
-from .executor import ExecutionEngine
-from .events import EventBus
+from .executor import ExecutionEngine, StepResult
+from .events import EventBus, Event
 from .domain import DomainLogicLayer
 
 __version__ = "0.1.0"
@@ -15,7 +15,9 @@ __all__ = [
     "AutoDiscoveryLayer",
     "WorkflowOrchestrator",
     "ExecutionEngine",
+    "StepResult",
     "EventBus",
+    "Event",
     "DomainLogicLayer",
 ]
 
@@ -0,0 +1,58 @@
+"""
+JSON helpers - uses orjson when installed, stdlib json otherwise
+"""
+
+import dataclasses
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse a JSON document"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path: Union[str, Path]) -> Any:
+    """Parse a JSON file, reading it as raw bytes"""
+    return loads(Path(path).read_bytes())
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for types neither backend handles natively"""
+    if hasattr(obj, "model_dump"):  # pydantic models, e.g. UTCP tool schemas
+        return obj.model_dump(by_alias=True, exclude_none=True)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """Serialize obj to compact JSON, stringifying unknown types"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=_default, option=option).decode()
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits, which stdlib json accepts
+            pass
+    return json.dumps(
+        obj, default=_default, separators=(",", ":"), sort_keys=sort_keys
+    )
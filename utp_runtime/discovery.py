@@ -3,6 +3,8 @@ Auto-Discovery Layer - Automatically finds and registers UTCP tools
 """
 
 import asyncio
+import os
+import re
 from pathlib import Path
 from typing import List, Dict, Optional
 import json
@@ -11,8 +13,15 @@ import logging
 from utcp.utcp_client import UtcpClient
 from utcp_text.text_call_template import TextCallTemplate
 
+from .events import EventBus
+
 logger = logging.getLogger(__name__)
 
+# File names picked up by discovery, checked against each directory entry once
+_MANUAL_FILE_RE = re.compile(
+    r".*\.utcp\.(?:json|ya?ml)|openapi\.json|swagger\.json", re.DOTALL
+)
+
 
 class AutoDiscoveryLayer:
     """
@@ -25,55 +34,84 @@ class AutoDiscoveryLayer:
     - Custom connector definitions
     """
     
-    def __init__(self, utcp_client: UtcpClient, discovery_paths: List[str]):
+    def __init__(
+        self,
+        utcp_client: UtcpClient,
+        discovery_paths: List[str],
+        max_concurrent_registrations: int = 16,
+        event_bus: Optional[EventBus] = None
+    ):
         self.utcp_client = utcp_client
         self.discovery_paths = [Path(p) for p in discovery_paths]
-        self.discovered_manuals: List[str] = []
+        self.max_concurrent_registrations = max_concurrent_registrations
+        self.event_bus = event_bus
+        # Manuals registered by discovery; subscribe to "discovery.registered"
+        # on the event bus for the individual paths
+        self.discovered_count = 0
     
     async def discover_and_register(self) -> int:
         """
         Discover all UTCP manuals and register them.
         
+        Manuals are registered concurrently, bounded by
+        max_concurrent_registrations.
+        
         Returns:
             Number of tools discovered
         """
-        total_tools = 0
+        utcp_files: List[Path] = []
         
         for path in self.discovery_paths:
             if not path.exists():
-                logger.warning(f"Discovery path does not exist: {path}")
+                logger.warning("Discovery path does not exist: %s", path)
                 continue
             
             # Scan for UTCP files
-            utcp_files = self._scan_for_utcp_files(path)
-            
-            for file_path in utcp_files:
+            utcp_files.extend(self._scan_for_utcp_files(path))
+        
+        semaphore = asyncio.Semaphore(self.max_concurrent_registrations)
+        
+        async def register(file_path: Path):
+            async with semaphore:
                 try:
                     await self.register_manual(str(file_path))
-                    self.discovered_manuals.append(str(file_path))
-                    total_tools += 1
-                    logger.info(f"Registered manual: {file_path}")
                 except Exception as e:
-                    logger.error(f"Failed to register {file_path}: {e}")
+                    logger.error("Failed to register %s: %s", file_path, e)
+                    raise
+            self.discovered_count += 1
+            logger.info("Registered manual: %s", file_path)
+            if self.event_bus is not None:
+                await self.event_bus.emit("discovery.registered", {
+                    "path": str(file_path)
+                })
         
-        logger.info(f"Auto-discovery complete: {total_tools} tools registered")
+        results = await asyncio.gather(
+            *(register(file_path) for file_path in utcp_files),
+            return_exceptions=True
+        )
+        total_tools = sum(not isinstance(r, Exception) for r in results)
+        
+        logger.info("Auto-discovery complete: %d tools registered", total_tools)
         return total_tools
     
     def _scan_for_utcp_files(self, root_path: Path) -> List[Path]:
         """Scan directory for UTCP manual files"""
         utcp_files = []
         
-        # Look for .utcp.json, .utcp.yaml, openapi.json, etc.
-        patterns = [
-            "**/*.utcp.json",
-            "**/*.utcp.yaml",
-            "**/*.utcp.yml",
-            "**/openapi.json",
-            "**/swagger.json"
-        ]
-        
-        for pattern in patterns:
-            utcp_files.extend(root_path.glob(pattern))
+        # Single walk over the tree; DirEntry caches the type from the
+        # directory listing, so no extra stat calls per entry
+        stack = [str(root_path)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif _MANUAL_FILE_RE.fullmatch(entry.name):
+                            utcp_files.append(Path(entry.path))
+            except OSError as e:
+                logger.warning("Cannot scan %s: %s", directory, e)
         
         return utcp_files
     
@@ -101,6 +139,12 @@ class AutoDiscoveryLayer:
             await self.utcp_client.registerManual(template)
         else:
             raise ValueError(f"Unsupported manual format: {path.suffix}")
+        
+        if self.event_bus is not None:
+            await self.event_bus.emit("tools.changed", {
+                "manual": path.stem,
+                "path": str(path)
+            })
     
     async def register_from_url(self, name: str, url: str):
         """
@@ -121,4 +165,10 @@ class AutoDiscoveryLayer:
         )
         
         await self.utcp_client.registerManual(template)
+        
+        if self.event_bus is not None:
+            await self.event_bus.emit("tools.changed", {
+                "manual": name,
+                "url": url
+            })
 
@@ -2,11 +2,11 @@
 Domain Logic Layer - Business rules, permissions, rate limiting
 """
 
-from typing import Dict, Optional
-import json
+from typing import Dict, List, Optional
 from pathlib import Path
 import logging
 
+from . import _json
 from .events import EventBus
 
 logger = logging.getLogger(__name__)
@@ -34,13 +34,17 @@ class DomainLogicLayer:
         """Load domain configuration"""
         path = Path(config_path)
         if not path.exists():
-            logger.warning(f"Config file not found: {config_path}")
+            logger.warning("Config file not found: %s", config_path)
             return
         
-        with open(path) as f:
-            config = json.load(f)
+        config = _json.load_file(path)
         
         self.permissions = config.get("permissions", {})
+        # Membership checks run on every step; store allowed actions as sets
+        for tool_perms in self.permissions.values():
+            tool_perms["allowed_actions"] = frozenset(
+                tool_perms.get("allowed_actions") or ()
+            )
         self.rate_limits = config.get("rate_limits", {})
         self.business_rules = config.get("business_rules", {})
     
@@ -56,25 +60,32 @@ class DomainLogicLayer:
             True if execution is allowed
         """
         # Check permissions
-        tool_perms = self.permissions.get(tool, {})
-        
-        if not tool_perms.get("enabled", True):
-            logger.warning(f"Tool {tool} is disabled")
-            return False
-        
-        allowed_actions = tool_perms.get("allowed_actions", [])
-        if allowed_actions and action not in allowed_actions:
-            logger.warning(f"Action {action} not allowed for {tool}")
+        if not self._check_permission(tool, action):
             return False
         
         # Check rate limits
         if not await self._check_rate_limit(tool, action):
-            logger.warning(f"Rate limit exceeded for {tool}.{action}")
+            logger.warning("Rate limit exceeded for %s.%s", tool, action)
             return False
         
         # Check business rules
         if not await self._check_business_rules(tool, action):
-            logger.warning(f"Business rule violation for {tool}.{action}")
+            logger.warning("Business rule violation for %s.%s", tool, action)
+            return False
+        
+        return True
+    
+    def _check_permission(self, tool: str, action: str) -> bool:
+        """Check tool/action permissions"""
+        tool_perms = self.permissions.get(tool, {})
+        
+        if not tool_perms.get("enabled", True):
+            logger.warning("Tool %s is disabled", tool)
+            return False
+        
+        allowed_actions = tool_perms.get("allowed_actions", ())
+        if allowed_actions and action not in allowed_actions:
+            logger.warning("Action %s not allowed for %s", action, tool)
             return False
         
         return True
@@ -95,7 +106,7 @@ class DomainLogicLayer:
         """Set permission for a tool"""
         self.permissions[tool] = {
             "enabled": enabled,
-            "allowed_actions": allowed_actions or []
+            "allowed_actions": frozenset(allowed_actions or ())
         }
     
     def add_business_rule(self, rule_name: str, rule_func):
@@ -3,13 +3,13 @@ UTP Runtime Engine - Main orchestration layer
 """
 
 import asyncio
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Union
 from pathlib import Path
-import json
 
 from utcp.utcp_client import UtcpClient
 from utcp.data.utcp_client_config import UtcpClientConfig
 
+from . import _json
 from .discovery import AutoDiscoveryLayer
 from .orchestrator import WorkflowOrchestrator
 from .executor import ExecutionEngine
@@ -44,6 +44,10 @@ class UTPRuntimeEngine:
         self.executor = executor
         self.event_bus = event_bus
         self.domain_layer = domain_layer
+        # Serialized tool list, rebuilt only after the tool set changes
+        self._tools_cache: Optional[List[Dict]] = None
+        self._tools_dirty = True
+        event_bus.subscribe("tools.changed", self._invalidate_tools)
     
     @classmethod
     async def create(
@@ -62,8 +66,7 @@ class UTPRuntimeEngine:
         """
         # Load config
         if config_path:
-            with open(config_path) as f:
-                config = json.load(f)
+            config = _json.load_file(config_path)
             utcp_config = config.get("utcp", {})
             discovery_paths = config.get("discovery_paths", ["./tools", "./connectors"])
         
@@ -71,8 +74,12 @@ class UTPRuntimeEngine:
         utcp_client = await UtcpClient.create(config=utcp_config or {})
         
         # Initialize layers
-        discovery_layer = AutoDiscoveryLayer(utcp_client, discovery_paths or [])
         event_bus = EventBus()
+        discovery_layer = AutoDiscoveryLayer(
+            utcp_client,
+            discovery_paths or [],
+            event_bus=event_bus
+        )
         domain_layer = DomainLogicLayer(event_bus)
         executor = ExecutionEngine(utcp_client, domain_layer, event_bus)
         orchestrator = WorkflowOrchestrator(utcp_client, executor, event_bus)
@@ -93,7 +100,7 @@ class UTPRuntimeEngine:
         self,
         user_request: str,
         session_id: Optional[str] = None,
-        context: Optional[Dict] = None
+        context: Optional[Union[Dict, str]] = None
     ) -> Dict[str, Any]:
         """
         Main entry point: Execute user request as multi-step workflow.
@@ -101,7 +108,8 @@ class UTPRuntimeEngine:
         Args:
             user_request: Natural language request
             session_id: Optional session ID for state tracking
-            context: Additional context for execution
+            context: Additional context for execution, either as a dict or
+                as returned by orchestrator.prepare_planning_context
         
         Returns:
             Execution result with workflow steps and outcomes
@@ -142,23 +150,40 @@ class UTPRuntimeEngine:
             raise
     
     async def get_available_tools(self) -> List[Dict]:
-        """Get all available tools with schemas"""
-        tools = await self.utcp_client.getTools()
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "inputs": tool.inputs,
-                "outputs": tool.outputs,
-                "tags": tool.tags
-            }
-            for tool in tools
-        ]
+        """
+        Get all available tools with schemas.
+        
+        Each tool dict is a fresh copy; the nested input and output
+        schemas are shared with the cache and must not be mutated.
+        """
+        if self._tools_dirty:
+            tools = await self.utcp_client.getTools()
+            self._tools_cache = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "inputs": tool.inputs,
+                    "outputs": tool.outputs,
+                    "tags": tool.tags
+                }
+                for tool in tools
+            ]
+            self._tools_dirty = False
+        
+        return [dict(tool) for tool in self._tools_cache]
+    
+    def _invalidate_tools(self, event=None):
+        """Mark the tool list stale (subscribed to "tools.changed")"""
+        self._tools_dirty = True
     
     async def register_tool_manual(self, manual_path: str):
         """Manually register a UTCP manual"""
         await self.discovery_layer.register_manual(manual_path)
     
+    async def discover_tools(self) -> int:
+        """Re-run auto-discovery over the configured discovery paths"""
+        return await self.discovery_layer.discover_and_register()
+    
     async def close(self):
         """Cleanup resources"""
         await self.utcp_client.close()
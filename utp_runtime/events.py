@@ -3,12 +3,43 @@ Event Bus - Real-time event system for monitoring and logging
 """
 
 import asyncio
-from typing import Dict, List, Callable, Any, Optional
-from collections import defaultdict
+import time
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Callable, Any, Optional, Tuple
+from collections import deque
 import logging
 
+from . import _json
+
 logger = logging.getLogger(__name__)
 
+Subscriber = Tuple[Callable, bool]
+
+
+@dataclass(slots=True)
+class Event:
+    """An emitted event, as passed to subscribers and kept in history"""
+    type: str
+    data: Dict[str, Any]
+    timestamp: float
+
+
+class _TopicNode:
+    """Node of the subscription trie, keyed on dot-separated topic segments"""
+    
+    __slots__ = ("children", "subscribers")
+    
+    def __init__(self):
+        self.children: Dict[str, "_TopicNode"] = {}
+        self.subscribers: List[Subscriber] = []
+
+
+def _pattern_segments(pattern: str) -> List[str]:
+    # A bare "*" has always meant "every event"
+    if pattern == "*":
+        return ["**"]
+    return pattern.split(".")
+
 
 class EventBus:
     """
@@ -16,15 +47,23 @@ class EventBus:
     
     Supports:
     - Event emission
-    - Event subscriptions
+    - Event subscriptions with topic patterns: "*" matches one
+      dot-separated segment ("workflow.*"), a trailing "**" matches one
+      or more segments ("step.**"), and a bare "*" matches every event
     - Logging integration
     - Metrics collection
     """
     
-    def __init__(self):
-        self.subscribers: Dict[str, List[Callable]] = defaultdict(list)
-        self.event_history: List[Dict] = []
-        self.max_history = 1000
+    def __init__(self, max_history: int = 1000):
+        # Subscribers are stored as (callback, is_coroutine) pairs so emit
+        # does not have to introspect callbacks on every event
+        self._topics = _TopicNode()
+        # Matched (sync, async) callbacks per event type; reset whenever
+        # subscriptions change
+        self._matches: Dict[str, Tuple[List[Callable], List[Callable]]] = {}
+        # Bounded ring buffer: the oldest event is dropped in O(1) once full
+        self.event_history: Deque[Event] = deque(maxlen=max_history)
+        self.max_history = max_history
     
     async def emit(self, event_type: str, data: Dict[str, Any]):
         """
@@ -34,59 +73,141 @@ class EventBus:
             event_type: Event type (e.g., "workflow.started")
             data: Event data
         """
-        event = {
-            "type": event_type,
-            "data": data,
-            "timestamp": asyncio.get_event_loop().time()
-        }
+        # Same monotonic clock as the default loop's time(), without
+        # looking up the event loop on every event
+        event = Event(event_type, data, time.monotonic())
         
         # Add to history
         self.event_history.append(event)
-        if len(self.event_history) > self.max_history:
-            self.event_history.pop(0)
         
-        # Log event
-        logger.info(f"Event: {event_type}", extra={"event_data": data})
+        # Log event; the payload is serialized once, and only if it is logged
+        if logger.isEnabledFor(logging.INFO):
+            try:
+                event_data = _json.dumps(data)
+            except (TypeError, ValueError):
+                event_data = repr(data)
+            logger.info("Event: %s", event_type, extra={"event_data": event_data})
         
         # Notify subscribers
-        subscribers = self.subscribers.get(event_type, [])
-        subscribers.extend(self.subscribers.get("*", []))  # Wildcard subscribers
+        matches = self._matches.get(event_type)
+        if matches is None:
+            matches = self._matches[event_type] = self._partition(self._match(event_type))
+        sync_callbacks, async_callbacks = matches
+        
+        for callback in sync_callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error("Error in event subscriber: %s", e)
         
-        for callback in subscribers:
+        # Async subscribers run concurrently, so emit waits for the slowest
+        # one rather than the sum of all of them
+        if len(async_callbacks) == 1:
             try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(event)
-                else:
-                    callback(event)
+                await async_callbacks[0](event)
             except Exception as e:
-                logger.error(f"Error in event subscriber: {e}")
+                logger.error("Error in event subscriber: %s", e)
+        elif async_callbacks:
+            results = await asyncio.gather(
+                *(callback(event) for callback in async_callbacks),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Error in event subscriber: %s", result)
+    
+    @staticmethod
+    def _partition(
+        subscribers: List[Subscriber]
+    ) -> Tuple[List[Callable], List[Callable]]:
+        """Split subscribers into (sync, async) callback lists"""
+        sync_callbacks = [cb for cb, is_coroutine in subscribers if not is_coroutine]
+        async_callbacks = [cb for cb, is_coroutine in subscribers if is_coroutine]
+        return sync_callbacks, async_callbacks
+    
+    def _match(self, event_type: str) -> List[Subscriber]:
+        """Walk the topic trie and collect every subscriber matching event_type"""
+        # "**" matches are collected separately so that catch-all
+        # subscribers run after the more specific ones
+        matched: List[Subscriber] = []
+        catch_all: List[Subscriber] = []
+        nodes = [self._topics]
+        
+        for segment in event_type.split("."):
+            next_nodes = []
+            for node in nodes:
+                children = node.children
+                rest = children.get("**")
+                if rest is not None:
+                    catch_all.extend(rest.subscribers)
+                exact = children.get(segment)
+                if exact is not None:
+                    next_nodes.append(exact)
+                single = children.get("*")
+                if single is not None:
+                    next_nodes.append(single)
+            nodes = next_nodes
+            if not nodes:
+                break
+        
+        for node in nodes:
+            matched.extend(node.subscribers)
+        matched.extend(catch_all)
+        return matched
     
     def subscribe(self, event_type: str, callback: Callable):
         """
         Subscribe to events.
         
         Args:
-            event_type: Event type or "*" for all events
+            event_type: Event type or topic pattern ("workflow.*", "*" for all events)
             callback: Callback function (can be async)
+        
+        Raises:
+            ValueError: If "**" is used anywhere but as the last segment
         """
-        self.subscribers[event_type].append(callback)
+        segments = _pattern_segments(event_type)
+        if "**" in segments[:-1]:
+            raise ValueError(
+                f"Invalid topic pattern {event_type!r}: '**' must be the last segment"
+            )
+        
+        node = self._topics
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _TopicNode()
+            node = child
+        
+        node.subscribers.append((callback, asyncio.iscoroutinefunction(callback)))
+        self._matches.clear()
     
     def unsubscribe(self, event_type: str, callback: Callable):
         """Unsubscribe from events"""
-        if callback in self.subscribers[event_type]:
-            self.subscribers[event_type].remove(callback)
+        node = self._topics
+        for segment in _pattern_segments(event_type):
+            node = node.children.get(segment)
+            if node is None:
+                return
+        
+        for i, (subscribed, _) in enumerate(node.subscribers):
+            if subscribed == callback:
+                del node.subscribers[i]
+                self._matches.clear()
+                break
     
-    def get_history(self, event_type: Optional[str] = None) -> List[Dict]:
+    def get_history(self, event_type: Optional[str] = None) -> List[Event]:
         """Get event history"""
         if event_type:
             return [
                 e for e in self.event_history
-                if e["type"] == event_type
+                if e.type == event_type
             ]
-        return self.event_history
+        return list(self.event_history)
     
     async def close(self):
         """Cleanup"""
-        self.subscribers.clear()
+        self._topics = _TopicNode()
+        self._matches.clear()
         self.event_history.clear()
 
@@ -2,10 +2,16 @@
 Execution Engine - Executes workflows with session management
 """
 
-import uuid
+import random
+import secrets
+import time
 import asyncio
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
 import logging
 
 from utcp.utcp_client import UtcpClient
@@ -15,6 +21,36 @@ from .events import EventBus
 
 logger = logging.getLogger(__name__)
 
+# Marker for a compiled "$step_id" parameter reference
+_REF = object()
+
+# Upper bound (seconds) for the exponential backoff between step retries
+MAX_RETRY_BACKOFF = 30
+
+
+def _utcnow() -> str:
+    """Current UTC time as an ISO 8601 string"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _thaw(value: Any) -> Any:
+    """Mutable copy of a value frozen by the planner's plan cache"""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+@dataclass(slots=True)
+class StepResult:
+    """Outcome of a single workflow step"""
+    step_id: str
+    success: bool
+    output: Any = None
+    error: Optional[str] = None
+    retry_count: int = 0
+
 
 class ExecutionEngine:
     """
@@ -29,16 +65,19 @@ class ExecutionEngine:
         self,
         utcp_client: UtcpClient,
         domain_layer: DomainLogicLayer,
-        event_bus: EventBus
+        event_bus: EventBus,
+        max_sessions: int = 10_000
     ):
         self.utcp_client = utcp_client
         self.domain_layer = domain_layer
         self.event_bus = event_bus
-        self.sessions: Dict[str, Dict] = {}
+        # LRU of sessions; the least recently used one is dropped past max_sessions
+        self.sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_sessions = max_sessions
     
     async def execute_workflow(
         self,
-        workflow: Dict[str, Any],
+        workflow: Mapping[str, Any],
         session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
@@ -52,19 +91,22 @@ class ExecutionEngine:
             Execution result with outcomes
         """
         if not session_id:
-            session_id = str(uuid.uuid4())
+            session_id = secrets.token_hex(16)
         
         # Initialize session
         session = {
             "session_id": session_id,
             "workflow": workflow,
-            "started_at": datetime.utcnow().isoformat(),
+            "started_at": _utcnow(),
             "steps": [],
             "state": {},
             "errors": [],
             "status": "running"
         }
         self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
         
         # Emit start event
         await self.event_bus.emit("execution.started", {
@@ -73,19 +115,49 @@ class ExecutionEngine:
         })
         
         try:
-            # Execute steps in order
-            for step in workflow.get("steps", []):
-                step_result = await self._execute_step(step, session)
-                session["steps"].append(step_result)
+            steps = self._compile_workflow(workflow)
+            # Results are kept by plan position so session["steps"] follows
+            # the plan, whatever order the waves finish in
+            positions = {id(step): index for index, step in enumerate(steps)}
+            step_results: List[Optional[StepResult]] = [None] * len(steps)
+            
+            # Execute steps wave by wave: each wave holds the steps whose
+            # dependencies have all finished, and runs them concurrently
+            for wave in self._schedule(steps):
+                # Check permissions for the whole wave first, so a denied
+                # step stops the workflow before any other step calls its tool
+                for step in wave:
+                    tool_name = step.get("tool")
+                    action = step.get("action")
+                    if not await self.domain_layer.can_execute(tool_name, action):
+                        raise PermissionError(f"Cannot execute {tool_name}.{action}")
                 
-                # Update state with step output
-                if step_result.get("success"):
-                    step_id = step.get("id", f"step_{len(session['steps'])}")
-                    session["state"][step_id] = step_result.get("output")
+                if len(wave) == 1:
+                    results = [await self._execute_step(wave[0], session)]
+                else:
+                    results = await self._run_wave(wave, session)
+                
+                error = None
+                for step, step_result in zip(wave, results):
+                    if step_result is None:
+                        continue
+                    if isinstance(step_result, BaseException):
+                        error = error or step_result
+                        continue
+                    step_results[positions[id(step)]] = step_result
+                    
+                    # Update state with step output
+                    if step_result.success:
+                        session["state"][step["id"]] = step_result.output
+                
+                session["steps"] = [r for r in step_results if r is not None]
+                
+                if error is not None:
+                    raise error
             
             # Mark as completed
             session["status"] = "completed"
-            session["completed_at"] = datetime.utcnow().isoformat()
+            session["completed_at"] = _utcnow()
             
             # Emit completion event
             await self.event_bus.emit("execution.completed", {
@@ -103,7 +175,7 @@ class ExecutionEngine:
             
         except Exception as e:
             session["status"] = "failed"
-            session["failed_at"] = datetime.utcnow().isoformat()
+            session["failed_at"] = _utcnow()
             session["errors"].append({
                 "error": str(e),
                 "type": type(e).__name__
@@ -117,13 +189,45 @@ class ExecutionEngine:
             
             raise
     
+    async def _run_wave(
+        self,
+        wave: List[Dict[str, Any]],
+        session: Dict
+    ) -> List[Any]:
+        """
+        Run a wave's steps concurrently.
+        
+        As soon as one step raises (a critical failure), the steps still
+        running are cancelled, so a failing workflow makes no further tool
+        calls. Returns each step's StepResult, exception, or None if it was
+        cancelled, in wave order.
+        """
+        tasks = [
+            asyncio.ensure_future(self._execute_step(step, session))
+            for step in wave
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # Siblings of a failed step, or every step if we were cancelled
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        return [
+            None if task.cancelled() else (task.exception() or task.result())
+            for task in tasks
+        ]
+    
     async def _execute_step(
         self,
         step: Dict[str, Any],
         session: Dict
-    ) -> Dict[str, Any]:
-        """Execute a single workflow step"""
-        step_id = step.get("id", f"step_{len(session['steps'])}")
+    ) -> StepResult:
+        """Execute a single workflow step; permissions are checked by the caller"""
+        step_id = step["id"]
         tool_name = step.get("tool")
         action = step.get("action")
         params = step.get("params", {})
@@ -131,107 +235,193 @@ class ExecutionEngine:
         max_retries = step.get("max_retries", 3)
         timeout = step.get("timeout", 30)
         
-        # Check permissions
-        if not await self.domain_layer.can_execute(tool_name, action):
-            raise PermissionError(f"Cannot execute {tool_name}.{action}")
+        # Resolve dependencies (use previous step outputs)
+        resolved_params = self._resolve_dependencies(params, session)
         
-        # Emit step start event
-        await self.event_bus.emit("step.started", {
+        async with self._step_span(session, step_id, tool_name, action) as span:
+            # Execute with retry logic; attempt stays bound even when a
+            # negative max_retries skips the loop
+            last_error = None
+            attempt = 0
+            
+            for attempt in range(max_retries + 1):
+                try:
+                    # Execute tool via UTCP
+                    result = await asyncio.wait_for(
+                        self.utcp_client.call_tool(
+                            tool_name=f"{tool_name}.{action}",
+                            tool_args=resolved_params
+                        ),
+                        timeout=timeout
+                    )
+                    
+                    span["result"] = result
+                    span["retry_count"] = attempt
+                    return StepResult(
+                        step_id=step_id,
+                        success=True,
+                        output=result,
+                        retry_count=attempt
+                    )
+                    
+                except Exception as e:
+                    last_error = e
+                    
+                    if not retry_on_error or attempt == max_retries:
+                        break
+                    
+                    logger.warning(
+                        "Step %s failed, retrying (%d/%d): %s",
+                        step_id, attempt + 1, max_retries, e
+                    )
+                    # Capped exponential backoff with jitter
+                    await asyncio.sleep(
+                        min(2 ** (attempt + 1), MAX_RETRY_BACKOFF) + random.random() * 0.1
+                    )
+            
+            # Step failed
+            span["error"] = str(last_error)
+            span["retry_count"] = attempt
+            
+            # Raise if critical, otherwise return error
+            if not retry_on_error:
+                raise last_error
+            
+            return StepResult(
+                step_id=step_id,
+                success=False,
+                error=str(last_error),
+                retry_count=attempt
+            )
+    
+    @asynccontextmanager
+    async def _step_span(
+        self,
+        session: Dict,
+        step_id: str,
+        tool_name: str,
+        action: str
+    ):
+        """
+        Time a step and emit one event when it ends.
+        
+        Emits "step.completed", or "step.failed" if the body set an
+        "error" on the yielded span or raised. The span dict is the event
+        payload, with the step duration in seconds added.
+        """
+        span = {
             "session_id": session["session_id"],
             "step_id": step_id,
             "tool": tool_name,
             "action": action
-        })
+        }
+        started = time.perf_counter()
         
-        # Resolve dependencies (use previous step outputs)
-        resolved_params = self._resolve_dependencies(params, session)
+        try:
+            yield span
+        except BaseException as e:
+            span.setdefault("error", str(e) or type(e).__name__)
+            raise
+        finally:
+            span["duration"] = time.perf_counter() - started
+            event_type = "step.failed" if "error" in span else "step.completed"
+            await self.event_bus.emit(event_type, span)
+    
+    def _compile_workflow(self, workflow: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Compile "$step_id" parameter references once per workflow.
         
-        # Execute with retry logic
-        retry_count = 0
-        last_error = None
-        
-        while retry_count <= max_retries:
-            try:
-                # Execute tool via UTCP
-                result = await asyncio.wait_for(
-                    self.utcp_client.call_tool(
-                        tool_name=f"{tool_name}.{action}",
-                        tool_args=resolved_params
-                    ),
-                    timeout=timeout
+        Each reference becomes a (_REF, step_id, original) tuple so that
+        resolving a step's params is a single state lookup per reference.
+        Steps without an id get "step_<n>" (1-based). The workflow itself
+        is left untouched; param values from a frozen plan are thawed so
+        tools receive plain dicts and lists.
+        """
+        compiled_steps = []
+        
+        for index, step in enumerate(workflow.get("steps", []), start=1):
+            params = {
+                key: (
+                    (_REF, value[1:], value)
+                    if isinstance(value, str) and value.startswith("$")
+                    else _thaw(value)
                 )
-                
-                # Emit step success event
-                await self.event_bus.emit("step.completed", {
-                    "session_id": session["session_id"],
-                    "step_id": step_id,
-                    "result": result
-                })
-                
-                return {
-                    "step_id": step_id,
-                    "success": True,
-                    "output": result,
-                    "retry_count": retry_count
-                }
-                
-            except Exception as e:
-                last_error = e
-                retry_count += 1
-                
-                if retry_on_error and retry_count <= max_retries:
-                    logger.warning(
-                        f"Step {step_id} failed, retrying ({retry_count}/{max_retries}): {e}"
-                    )
-                    await asyncio.sleep(2 ** retry_count)  # Exponential backoff
-                else:
-                    break
+                for key, value in step.get("params", {}).items()
+            }
+            compiled_steps.append({
+                **step,
+                "id": step.get("id") or f"step_{index}",
+                "params": params
+            })
         
-        # Step failed
-        error_info = {
-            "step_id": step_id,
-            "success": False,
-            "error": str(last_error),
-            "retry_count": retry_count
-        }
+        return compiled_steps
+    
+    def _schedule(self, steps: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Group compiled steps into waves that can run concurrently.
         
-        # Emit step error event
-        await self.event_bus.emit("step.failed", {
-            "session_id": session["session_id"],
-            "step_id": step_id,
-            "error": str(last_error)
-        })
+        A step depends on the steps listed in its "depends_on" and on any
+        step its params reference. Unknown step ids are ignored. Steps keep
+        their workflow order within a wave.
+        """
+        step_ids = {step["id"] for step in steps}
+        dependencies = {}
+        
+        for step in steps:
+            depends_on = step.get("depends_on") or ()
+            if isinstance(depends_on, str):
+                depends_on = (depends_on,)
+            
+            deps = set(depends_on)
+            deps.update(
+                value[1] for value in step["params"].values()
+                if type(value) is tuple and value and value[0] is _REF
+            )
+            deps &= step_ids
+            deps.discard(step["id"])
+            dependencies[step["id"]] = deps
         
-        # Raise if critical, otherwise return error
-        if not retry_on_error:
-            raise last_error
+        waves = []
+        finished: set = set()
+        pending = steps
         
-        return error_info
+        while pending:
+            wave = [step for step in pending if dependencies[step["id"]] <= finished]
+            if not wave:
+                raise ValueError(
+                    "Circular step dependencies: "
+                    + ", ".join(step["id"] for step in pending)
+                )
+            waves.append(wave)
+            finished.update(step["id"] for step in wave)
+            pending = [step for step in pending if step["id"] not in finished]
+        
+        return waves
     
     def _resolve_dependencies(
         self,
         params: Dict[str, Any],
         session: Dict
     ) -> Dict[str, Any]:
-        """Resolve parameter dependencies from previous steps"""
-        resolved = {}
-        
-        for key, value in params.items():
-            if isinstance(value, str) and value.startswith("$"):
-                # Reference to previous step output
-                step_ref = value[1:]  # Remove $
-                if step_ref in session["state"]:
-                    resolved[key] = session["state"][step_ref]
-                else:
-                    resolved[key] = value  # Keep as-is if not found
-            else:
-                resolved[key] = value
+        """Resolve compiled parameter references from previous steps"""
+        state = session["state"]
         
-        return resolved
+        # Unresolved references keep their original "$step_id" value
+        return {
+            key: (
+                state.get(value[1], value[2])
+                if type(value) is tuple and value and value[0] is _REF
+                else value
+            )
+            for key, value in params.items()
+        }
     
     def get_session(self, session_id: str) -> Optional[Dict]:
         """Get session state"""
-        return self.sessions.get(session_id)
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        return session
     
     def list_sessions(self) -> List[Dict]:
         """List all active sessions"""
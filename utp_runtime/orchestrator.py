@@ -2,19 +2,157 @@
 Workflow Orchestrator - Plans and manages multi-step workflows
 """
 
+import asyncio
+import hashlib
 import json
-from typing import Dict, List, Optional, Any
+import re
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Tuple, Union
 import logging
 
 from utcp.utcp_client import UtcpClient
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import SchemaError, best_match
+from pydantic import BaseModel, Field
 import os
 
+from . import _json
 from .executor import ExecutionEngine
 from .events import EventBus
 
 logger = logging.getLogger(__name__)
 
+# Fallbacks for LLM responses that wrap the plan in code fences or prose:
+# every fenced block is tried first, then the outermost braced span
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Shape of a planned workflow, checked before it reaches the executor
+WORKFLOW_SCHEMA = {
+    "type": "object",
+    "required": ["steps"],
+    "properties": {
+        "steps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["tool"],
+                "properties": {
+                    "id": {"type": "string"},
+                    "tool": {"type": "string"},
+                    "action": {"type": "string"},
+                    "params": {"type": "object"},
+                    "depends_on": {"type": "array", "items": {"type": "string"}},
+                    "retry_on_error": {"type": "boolean"},
+                    "max_retries": {"type": "integer", "minimum": 0},
+                    "timeout": {"type": "number", "exclusiveMinimum": 0}
+                }
+            }
+        },
+        "expected_output": {"type": "string"}
+    }
+}
+
+# Built once; jsonschema.validate() would rebuild a validator on every call
+_PLAN_VALIDATOR = Draft202012Validator(WORKFLOW_SCHEMA)
+
+# Seconds a fetched tool list is reused before asking the UTCP client again
+TOOLS_CACHE_TTL = 60.0
+
+# Validated plans kept for repeated (request, context, tool set) inputs
+PLAN_CACHE_SIZE = 256
+
+# Distinct tool sets whose planning schemas are kept serialized
+TOOL_SCHEMA_CACHE_SIZE = 32
+
+# Plans with at least this many parameter checks are validated in a worker
+# thread, keeping the event loop responsive while schemas are checked
+THREADED_VALIDATION_THRESHOLD = 20
+
+# Longest LLM response (in characters) that is parsed as a plan
+MAX_LLM_RESPONSE_SIZE = 256_000
+
+# Planning prompt, parsed once; the values are filled in per call. The
+# context and format_instructions values carry their own leading text and
+# are empty when unused.
+_PLANNING_PROMPT = ChatPromptTemplate.from_template(
+    "You are a workflow planning system. Plan a multi-step workflow to "
+    "accomplish the user's request.\n\n"
+    "User Request: {user_request}\n"
+    "{context}\n\n"
+    "Available Tools:\n"
+    "{tools}\n\n"
+    "Create a workflow plan.{format_instructions}\n\n"
+    "Rules:\n"
+    "- Use tool names exactly as shown (format: manual_name.tool_name)\n"
+    "- Each step can depend on previous steps using step IDs\n"
+    "- Include all required parameters for each tool\n"
+    "- Plan for error handling and retries\n"
+    "- Consider data flow between steps\n"
+)
+
+# Output format spelled out in the prompt for LLMs without structured output
+_JSON_FORMAT_INSTRUCTIONS = """
+Return ONLY valid JSON in this format:
+{
+    "steps": [
+        {
+            "id": "step_1",
+            "tool": "tool_name",
+            "action": "action_name",
+            "params": {},
+            "depends_on": [],
+            "retry_on_error": true,
+            "timeout": 30
+        }
+    ],
+    "expected_output": "description of final result"
+}
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class ToolView:
+    """Projection of a UTCP tool as shown to the planning LLM"""
+    name: str
+    description: str
+    inputs: Any
+    outputs: Any
+    tags: Any
+
+
+class PlannedStep(BaseModel):
+    """A single step of an LLM-planned workflow"""
+    id: str
+    tool: str
+    action: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    depends_on: List[str] = Field(default_factory=list)
+    retry_on_error: bool = True
+    timeout: float = 30
+
+
+class WorkflowPlan(BaseModel):
+    """Workflow plan, used as the LLM's structured output schema"""
+    steps: List[PlannedStep]
+    expected_output: str = ""
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only copy of a JSON-like value: dicts become mapping proxies, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
 
 class WorkflowOrchestrator:
     """
@@ -34,157 +172,433 @@ class WorkflowOrchestrator:
         self.utcp_client = utcp_client
         self.executor = executor
         self.event_bus = event_bus
-        self.llm = llm or ChatOpenAI(
+        if llm is not None:
+            # Shadows the lazily constructed default below
+            self.llm = llm
+        # Tool set signature -> (schemas, schemas_json)
+        self._tool_schema_cache: "OrderedDict[str, Tuple[List[ToolView], str]]" = OrderedDict()
+        # (signature, {name: tool}) for the last tool set validated against
+        self._tool_map_cache: Optional[Tuple[str, Dict[str, Any]]] = None
+        # Tool name -> validator for its input schema (None: nothing to check)
+        self._param_validators: Dict[str, Optional[Draft202012Validator]] = {}
+        # Plan cache key -> frozen validated workflow, least recently used first
+        self._plan_cache: "OrderedDict[str, Mapping[str, Any]]" = OrderedDict()
+        
+        # Tool list from the UTCP client, refreshed after TOOLS_CACHE_TTL or
+        # whenever a manual is registered. _tools_sig identifies the tool set
+        # and keys the planning caches; it is computed once per refresh.
+        self._tools: Optional[List] = None
+        self._tools_sig = ""
+        self._tools_fetched_at = 0.0
+        self._tools_generation = 0
+        self._tools_task: Optional[asyncio.Task] = None
+        event_bus.subscribe("tools.changed", self._invalidate_tools)
+    
+    @cached_property
+    def llm(self) -> ChatOpenAI:
+        """Default planning LLM, constructed on first use"""
+        return ChatOpenAI(
             model="gpt-4o-mini",
             api_key=os.getenv("OPENAI_API_KEY")
         )
     
+    @cached_property
+    def _structured_llm(self):
+        """Planning LLM bound to the WorkflowPlan schema, or None"""
+        return self._bind_structured_output(self.llm)
+    
+    @cached_property
+    def _plan_chain(self):
+        """Planning prompt piped into the structured-output LLM, or None"""
+        if self._structured_llm is None:
+            return None
+        return _PLANNING_PROMPT | self._structured_llm
+    
+    @cached_property
+    def _text_chain(self):
+        """Planning prompt piped into the plain LLM, for free-text plans"""
+        return _PLANNING_PROMPT | self.llm
+    
+    @staticmethod
+    def _bind_structured_output(llm):
+        """Bind WorkflowPlan as the LLM output schema; None if unsupported"""
+        try:
+            return llm.with_structured_output(WorkflowPlan, method="function_calling")
+        except (AttributeError, NotImplementedError) as e:
+            logger.info("Structured output unavailable, parsing free text: %s", e)
+            return None
+    
     async def plan_workflow(
         self,
         user_request: str,
-        context: Optional[Dict] = None
-    ) -> Dict[str, Any]:
+        context: Optional[Union[Dict, str]] = None
+    ) -> Mapping[str, Any]:
         """
         Plan a multi-step workflow from natural language request.
         
         Args:
             user_request: Natural language description of what to do
-            context: Additional context for planning
+            context: Additional context for planning, either as a dict or
+                as returned by prepare_planning_context
         
         Returns:
-            Workflow definition with steps, dependencies, etc.
+            Workflow definition with steps, dependencies, etc. The plan is
+            read-only (mappings and tuples) and may be shared with the plan
+            cache; callers must not mutate it.
         """
         # Get available tools
-        tools = await self.utcp_client.getTools()
+        tools, tools_sig = await self._get_tools()
+        
+        if isinstance(context, str):
+            context_json = context
+        else:
+            context_json = self.prepare_planning_context(context)
+        
+        # Identical requests against the same context and tool set reuse the plan
+        cache_key = self._plan_cache_key(user_request, context_json, tools_sig)
+        cached = self._plan_cache.get(cache_key)
+        if cached is not None:
+            self._plan_cache.move_to_end(cache_key)
+            await self.event_bus.emit("workflow.planned", {
+                "workflow": cached,
+                "request": user_request
+            })
+            return cached
         
         # Format tools for LLM
-        tool_schemas = self._format_tools_for_planning(tools)
+        _, tool_schemas_json = self._format_tools_for_planning(tools, tools_sig)
         
-        # Build planning prompt
-        prompt = self._build_planning_prompt(
+        # Build planning prompt inputs
+        prompt_inputs = self._build_planning_inputs(
             user_request,
-            tool_schemas,
-            context
+            tool_schemas_json,
+            context_json,
+            structured=self._plan_chain is not None
         )
         
         # Get LLM plan
-        response = await self.llm.ainvoke(prompt)
-        
-        # Parse workflow
-        workflow = self._parse_workflow(response.content)
+        if self._plan_chain is not None:
+            plan = await self._plan_chain.ainvoke(prompt_inputs)
+            if plan is None:
+                raise ValueError("Invalid workflow format: no plan returned")
+            workflow = plan.model_dump()
+        else:
+            workflow = await self._stream_workflow(prompt_inputs)
         
         # Validate workflow
-        validated_workflow = await self._validate_workflow(workflow, tools)
+        validated_workflow = await self._validate_workflow(workflow, tools, tools_sig)
         
-        # Emit event
+        # Freeze once at store time so cache hits are returned without copying
+        workflow = _freeze(validated_workflow)
+        self._plan_cache[cache_key] = workflow
+        if len(self._plan_cache) > PLAN_CACHE_SIZE:
+            self._plan_cache.popitem(last=False)
+        
+        # Emit event; awaited so subscribers see the plan before execution starts
         await self.event_bus.emit("workflow.planned", {
-            "workflow": validated_workflow,
+            "workflow": workflow,
             "request": user_request
         })
         
-        return validated_workflow
-    
-    def _format_tools_for_planning(self, tools) -> List[Dict]:
-        """Format UTCP tools for LLM planning"""
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "inputs": tool.inputs,
-                "outputs": tool.outputs,
-                "tags": tool.tags
-            }
+        return workflow
+    
+    @staticmethod
+    def prepare_planning_context(context: Optional[Dict]) -> str:
+        """
+        Serialize planning context once for reuse across plan_workflow calls.
+        
+        Callers that plan repeatedly against the same context can pass the
+        returned string as plan_workflow's context instead of the dict.
+        
+        Args:
+            context: Additional context for planning
+        
+        Returns:
+            Compact, key-sorted JSON (stable for hashing and cheap in
+            tokens), or "" when there is no context
+        """
+        return _json.dumps(context, sort_keys=True) if context else ""
+    
+    @staticmethod
+    def _plan_cache_key(
+        user_request: str,
+        context_json: str,
+        tools_sig: str
+    ) -> str:
+        """Content hash of the request, canonical context and tool set signature"""
+        key_material = _json.dumps([user_request, context_json, tools_sig])
+        return hashlib.blake2b(key_material.encode(), digest_size=16).hexdigest()
+    
+    async def _get_tools(self) -> Tuple[List, str]:
+        """
+        Get available tools and their signature, cached for TOOLS_CACHE_TTL.
+        
+        Concurrent callers share a single in-flight getTools() call.
+        """
+        if (
+            self._tools is not None
+            and time.monotonic() - self._tools_fetched_at < TOOLS_CACHE_TTL
+        ):
+            return self._tools, self._tools_sig
+        
+        if self._tools_task is None:
+            self._tools_task = asyncio.ensure_future(self._fetch_tools())
+        # Shielded so a cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(self._tools_task)
+    
+    async def _fetch_tools(self) -> Tuple[List, str]:
+        """Fetch tools from the UTCP client and cache them with their signature"""
+        generation = self._tools_generation
+        try:
+            tools = await self.utcp_client.getTools()
+        finally:
+            if self._tools_task is asyncio.current_task():
+                self._tools_task = None
+        
+        # The signature covers everything the planner sees of each tool, so
+        # a refetch that changes any schema yields a new one
+        projected = self._project_tools(tools)
+        tools_sig = hashlib.blake2b(projected[1].encode(), digest_size=16).hexdigest()
+        self._store_tool_schemas(tools_sig, projected)
+        
+        # Only cache if no manual was registered while fetching
+        if generation == self._tools_generation:
+            if tools_sig != self._tools_sig:
+                # Validators are cached per tool name; rebuild on any change
+                self._param_validators.clear()
+            self._tools = tools
+            self._tools_sig = tools_sig
+            self._tools_fetched_at = time.monotonic()
+        return tools, tools_sig
+    
+    def _invalidate_tools(self, event=None):
+        """Drop the cached tools and everything derived from them (subscribed to "tools.changed")"""
+        self._tools = None
+        self._tools_sig = ""
+        self._tools_generation += 1
+        self._tools_task = None
+        self._param_validators.clear()
+        self._tool_map_cache = None
+        self._plan_cache.clear()
+    
+    def _format_tools_for_planning(
+        self,
+        tools: List,
+        tools_sig: str
+    ) -> Tuple[List[ToolView], str]:
+        """
+        Format UTCP tools for LLM planning.
+        
+        Returns the tool schemas and their JSON serialization. They are
+        built when the tools are fetched and cached per tool set
+        signature, so this is normally a lookup.
+        """
+        cached = self._tool_schema_cache.get(tools_sig)
+        if cached is not None:
+            self._tool_schema_cache.move_to_end(tools_sig)
+            return cached
+        
+        cached = self._project_tools(tools)
+        self._store_tool_schemas(tools_sig, cached)
+        return cached
+    
+    @staticmethod
+    def _project_tools(tools: List) -> Tuple[List[ToolView], str]:
+        """Project tools to ToolViews and serialize them for the prompt"""
+        tool_schemas = [
+            ToolView(tool.name, tool.description, tool.inputs, tool.outputs, tool.tags)
             for tool in tools
         ]
+        return tool_schemas, _json.dumps(tool_schemas)
+    
+    def _store_tool_schemas(self, tools_sig: str, schemas: Tuple[List[ToolView], str]):
+        """Cache projected tool schemas under their signature"""
+        self._tool_schema_cache[tools_sig] = schemas
+        self._tool_schema_cache.move_to_end(tools_sig)
+        if len(self._tool_schema_cache) > TOOL_SCHEMA_CACHE_SIZE:
+            self._tool_schema_cache.popitem(last=False)
     
-    def _build_planning_prompt(
+    def _build_planning_inputs(
         self,
         user_request: str,
-        tool_schemas: List[Dict],
-        context: Optional[Dict]
-    ) -> str:
-        """Build LLM prompt for workflow planning"""
-        context_str = ""
-        if context:
-            context_str = f"\nAdditional Context:\n{json.dumps(context, indent=2)}"
+        tool_schemas_json: str,
+        context_json: str,
+        structured: bool = False
+    ) -> Dict[str, str]:
+        """
+        Build the planning prompt's template values.
         
-        return f"""You are a workflow planning system. Plan a multi-step workflow to accomplish the user's request.
-
-User Request: {user_request}
-{context_str}
-
-Available Tools:
-{json.dumps(tool_schemas, indent=2)}
-
-Create a workflow plan. Return ONLY valid JSON in this format:
-{{
-    "steps": [
-        {{
-            "id": "step_1",
-            "tool": "tool_name",
-            "action": "action_name",
-            "params": {{}},
-            "depends_on": [],
-            "retry_on_error": true,
-            "timeout": 30
-        }}
-    ],
-    "expected_output": "description of final result"
-}}
-
-Rules:
-- Use tool names exactly as shown (format: manual_name.tool_name)
-- Each step can depend on previous steps using step IDs
-- Include all required parameters for each tool
-- Plan for error handling and retries
-- Consider data flow between steps
-"""
+        With structured output the plan schema reaches the LLM through the
+        bound tool definition, so the JSON format block is left out.
+        """
+        return {
+            "user_request": user_request,
+            "context": "\nAdditional Context:\n" + context_json if context_json else "",
+            "tools": tool_schemas_json,
+            "format_instructions": "" if structured else _JSON_FORMAT_INSTRUCTIONS
+        }
     
-    def _parse_workflow(self, llm_response: str) -> Dict:
+    async def _stream_workflow(self, prompt_inputs: Dict[str, str]) -> Dict:
+        """
+        Stream the LLM response and parse the plan as soon as it is complete.
+        
+        Chunks are collected in a list and only joined when the braces seen
+        so far balance out on a closing brace, so accumulation stays linear
+        and trailing prose after the plan is never waited for. The stream
+        is abandoned once it grows past MAX_LLM_RESPONSE_SIZE.
+        """
+        chunks: List[str] = []
+        size = 0
+        depth = 0
+        
+        async with aclosing(self._text_chain.astream(prompt_inputs)) as stream:
+            async for chunk in stream:
+                text = chunk.content
+                chunks.append(text)
+                size += len(text)
+                if size > MAX_LLM_RESPONSE_SIZE:
+                    break
+                
+                depth += text.count("{") - text.count("}")
+                if depth == 0 and text.rstrip().endswith("}"):
+                    # Early attempts fail quietly; only the final parse logs
+                    try:
+                        workflow = self._decode_workflow("".join(chunks))
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(workflow, dict) and "steps" in workflow:
+                        return workflow
+        
+        return await self._parse_workflow("".join(chunks))
+    
+    async def _parse_workflow(self, llm_response: str) -> Dict:
         """Parse LLM response into workflow structure"""
-        # Try to extract JSON from response
+        # Fail fast rather than spend CPU and memory on a runaway response
+        if len(llm_response) > MAX_LLM_RESPONSE_SIZE:
+            await self.event_bus.emit("workflow.response_too_large", {
+                "size": len(llm_response),
+                "limit": MAX_LLM_RESPONSE_SIZE
+            })
+            raise ValueError("LLM response too large")
+        
         try:
-            # Look for JSON block
-            if "```json" in llm_response:
-                json_start = llm_response.find("```json") + 7
-                json_end = llm_response.find("```", json_start)
-                json_str = llm_response[json_start:json_end].strip()
-            elif "```" in llm_response:
-                json_start = llm_response.find("```") + 3
-                json_end = llm_response.find("```", json_start)
-                json_str = llm_response[json_start:json_end].strip()
-            else:
-                # Try to find JSON object
-                json_start = llm_response.find("{")
-                json_end = llm_response.rfind("}") + 1
-                json_str = llm_response[json_start:json_end]
-            
-            return json.loads(json_str)
-        except Exception as e:
-            logger.error(f"Failed to parse workflow: {e}")
-            raise ValueError(f"Invalid workflow format: {e}")
+            return self._decode_workflow(llm_response)
+        except json.JSONDecodeError as error:
+            logger.error("Failed to parse workflow: %s", error)
+            raise ValueError(f"Invalid workflow format: {error}")
+    
+    @staticmethod
+    def _decode_workflow(llm_response: str) -> Any:
+        """Decode the plan JSON in an LLM response; raises json.JSONDecodeError"""
+        # Fast path: the response is the JSON document itself
+        try:
+            return _json.loads(llm_response)
+        except json.JSONDecodeError as e:
+            error = e
+        
+        # Otherwise try each fenced block in turn, then the outermost braced
+        # span; fences come first so braces in surrounding prose cannot
+        # swallow a fenced plan
+        candidates = [match.group(1) for match in _FENCE_RE.finditer(llm_response)]
+        match = _OBJ_RE.search(llm_response)
+        if match is not None:
+            candidates.append(match.group())
+        
+        for candidate in candidates:
+            try:
+                return _json.loads(candidate)
+            except json.JSONDecodeError as e:
+                error = e
+        
+        raise error
+    
+    def _get_tool_map(self, available_tools: List, tools_sig: str) -> Dict[str, Any]:
+        """Name -> tool mapping, rebuilt only when the tool set signature changes"""
+        cached = self._tool_map_cache
+        if cached is not None and cached[0] == tools_sig:
+            return cached[1]
+        
+        tool_map = {tool.name: tool for tool in available_tools}
+        self._tool_map_cache = (tools_sig, tool_map)
+        return tool_map
+    
+    def _get_param_validator(self, tool) -> Optional[Draft202012Validator]:
+        """Validator for a tool's input schema, built once per tool"""
+        if tool.name in self._param_validators:
+            return self._param_validators[tool.name]
+        
+        schema = tool.inputs
+        if hasattr(schema, "model_dump"):  # UTCP JsonSchema model
+            schema = schema.model_dump(by_alias=True, exclude_none=True)
+        
+        validator = None
+        if schema:
+            try:
+                Draft202012Validator.check_schema(schema)
+                validator = Draft202012Validator(schema)
+            except SchemaError as e:
+                logger.warning(
+                    "Skipping parameter validation for %s, invalid input schema: %s",
+                    tool.name, e.message
+                )
+        
+        self._param_validators[tool.name] = validator
+        return validator
     
     async def _validate_workflow(
         self,
         workflow: Dict,
-        available_tools: List
+        available_tools: List,
+        tools_sig: str
     ) -> Dict:
-        """Validate workflow against available tools"""
-        tool_map = {tool.name: tool for tool in available_tools}
+        """Validate workflow against the plan schema and available tools"""
+        error = best_match(_PLAN_VALIDATOR.iter_errors(workflow))
+        if error is not None:
+            raise ValueError(f"Invalid workflow format: {error.message}")
         
-        validated_steps = []
-        for step in workflow.get("steps", []):
-            tool_name = step.get("tool")
-            
-            if tool_name not in tool_map:
-                raise ValueError(f"Tool not found: {tool_name}")
-            
-            # Validate parameters against tool schema
-            tool = tool_map[tool_name]
-            # TODO: Add parameter validation
+        tool_map = self._get_tool_map(available_tools, tools_sig)
+        get_tool = tool_map.get
+        
+        # Steps are checked in place; the plan schema guarantees "tool".
+        # Validators are built here, on the loop, so the worker thread below
+        # only runs validation and never touches the validator cache.
+        checks = []
+        for step in workflow["steps"]:
+            tool = get_tool(step["tool"])
+            if tool is None:
+                raise ValueError(f"Tool not found: {step['tool']}")
             
-            validated_steps.append(step)
+            validator = self._get_param_validator(tool)
+            if validator is not None:
+                checks.append((step, validator))
+        
+        # Validate parameters against tool schemas. Validation holds the
+        # GIL, so long plans get a single thread hop, not one per step.
+        if len(checks) < THREADED_VALIDATION_THRESHOLD:
+            self._validate_all_params(checks)
+        else:
+            await asyncio.to_thread(self._validate_all_params, checks)
         
-        workflow["steps"] = validated_steps
         return workflow
-
+    
+    @classmethod
+    def _validate_all_params(cls, checks: List[Tuple[Dict, Draft202012Validator]]):
+        """Validate each step's params in plan order, raising on the first failure"""
+        for step, validator in checks:
+            cls._validate_params(step, validator)
+    
+    @staticmethod
+    def _validate_params(step: Dict, validator: Draft202012Validator):
+        """Validate step params; "$step_id" references are resolved at run time"""
+        params = step.get("params", {})
+        references = {
+            key for key, value in params.items()
+            if isinstance(value, str) and value.startswith("$")
+        }
+        
+        for error in validator.iter_errors(params):
+            if error.path and error.path[0] in references:
+                continue
+            raise ValueError(
+                f"Invalid params for step {step.get('id', step['tool'])}: {error.message}"
+            )